@@ -0,0 +1,191 @@
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class TokenBucket:
+    def __init__(self, requests_per_minute, burst=None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = burst or max(1.0, self.rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        # A quota error means every worker is over the limit, not just the one
+        # that saw it, so drain the shared bucket instead of backing off alone.
+        with self._lock:
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class BatchRunner:
+    def __init__(
+        self,
+        model,
+        workers=8,
+        requests_per_minute=60,
+        max_retries=5,
+        backoff_base=1.0,
+        backoff_cap=60.0,
+    ):
+        self.model = model
+        self.workers = workers
+        self.bucket = TokenBucket(requests_per_minute)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    def run(self, input_filename, output_filename, checkpoint_filename=None):
+        checkpoint_filename = checkpoint_filename or output_filename + ".checkpoint"
+        finished = _read_checkpoint(checkpoint_filename)
+        counts = {"completed": 0, "failed": 0, "skipped": 0}
+
+        with open(output_filename, "a", encoding="utf-8") as output, open(
+            checkpoint_filename, "a", encoding="utf-8"
+        ) as checkpoint, ThreadPoolExecutor(self.workers) as executor:
+            pending = set()
+            try:
+                for request in _read_requests(input_filename):
+                    if request["request_id"] in finished:
+                        counts["skipped"] += 1
+                        continue
+                    if len(pending) >= self.workers * 2:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        self._write(done, output, checkpoint, counts)
+                    pending.add(executor.submit(self._process, request))
+                while pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._write(done, output, checkpoint, counts)
+            except BaseException:
+                # Unwritten results are not checkpointed; a resumed run redoes them.
+                executor.shutdown(cancel_futures=True)
+                raise
+        return counts
+
+    def _process(self, request):
+        if "error" in request:
+            return {**request, "attempts": 0, "elapsed": 0.0}
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            self.bucket.acquire()
+            try:
+                chat = self.model.start_chat(history=request["history"])
+                response = chat.send_message(request["prompt"])
+                result = {"response": response.text}
+                break
+            except Exception as e:
+                if not is_retryable(e) or attempt > self.max_retries:
+                    result = {"error": f"An error occurred: {e}"}
+                    break
+                delay = random.uniform(
+                    0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1))
+                )
+                self.bucket.pause(delay)
+                time.sleep(delay)
+        result.update(
+            request_id=request["request_id"],
+            attempts=attempt,
+            elapsed=round(time.monotonic() - started, 3),
+        )
+        return result
+
+    def _write(self, futures, output, checkpoint, counts):
+        for future in futures:
+            result = future.result()
+            output.write(json.dumps(result, ensure_ascii=False) + "\n")
+            output.flush()
+            if "error" in result:
+                counts["failed"] += 1
+                continue
+            # Only successes are checkpointed, so a resumed run retries failures.
+            checkpoint.write(json.dumps(result["request_id"]) + "\n")
+            checkpoint.flush()
+            counts["completed"] += 1
+
+
+def is_retryable(error):
+    try:
+        from google.api_core import exceptions
+    except ImportError:
+        exceptions = None
+    if exceptions is not None and isinstance(
+        error,
+        (
+            exceptions.ResourceExhausted,
+            exceptions.TooManyRequests,
+            exceptions.ServiceUnavailable,
+        ),
+    ):
+        return True
+    return getattr(error, "code", None) in (429, 503)
+
+
+def _read_checkpoint(filename):
+    if not os.path.exists(filename):
+        return set()
+    with open(filename, "r", encoding="utf-8") as file:
+        # A line without its newline was cut off mid-write; redo that request.
+        return {json.loads(line) for line in file if line.endswith("\n")}
+
+
+def _read_requests(filename):
+    with open(filename, "r", encoding="utf-8") as file:
+        for line_number, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            request_id = f"line-{line_number}"
+            try:
+                record = json.loads(line)
+                given = record.get("request_id", request_id)
+                if not _valid_request_id(given):
+                    raise TypeError("request_id must be a string or an integer.")
+                request_id = given
+                request = _parse_request(record)
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                # A bad line fails only its own request instead of the whole run.
+                reason = f"missing {e}" if isinstance(e, KeyError) else e
+                request = {"error": f"Invalid request on line {line_number}: {reason}"}
+            request["request_id"] = request_id
+            yield request
+
+
+def _valid_request_id(request_id):
+    # Ids are matched against the checkpoint set, so they must be hashable, and
+    # True would collide with 1.
+    return isinstance(request_id, (str, int)) and not isinstance(request_id, bool)
+
+
+def _parse_request(record):
+    if "messages" not in record:
+        return {"history": [], "prompt": record["prompt"]}
+    messages = record["messages"]
+    if not messages or messages[-1].get("role", "user") != "user":
+        raise ValueError("a conversation must end with a user message.")
+    return {
+        "history": [_as_content(message) for message in messages[:-1]],
+        "prompt": messages[-1]["text"],
+    }
+
+
+def _as_content(message):
+    role = message.get("role", "user")
+    return {"role": "model" if role == "gemini" else role, "parts": [message["text"]]}
@@ -0,0 +1,88 @@
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from chat import run_repl  # noqa: E402
+from fake_gemini import FakeGenerativeModel, split_chunks  # noqa: E402
+from instrumentation import METRICS  # noqa: E402
+
+SCRIPT = [
+    "Here is a short answer.",
+    "Here is a longer answer that spans a few sentences. It keeps going for a "
+    "while so that it arrives as several chunks. Then it stops.",
+    "* A list item\n* Another list item\n* A third item with more words in it",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the REPL offline.")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--first-chunk-delay", type=float, default=0.005)
+    parser.add_argument("--chunk-delay", type=float, default=0.001)
+    parser.add_argument("--words-per-chunk", type=int, default=4)
+    parser.add_argument(
+        "--budget-ms",
+        type=float,
+        help="fail if the per-turn overhead on top of the fake's delays exceeds this",
+    )
+    parser.add_argument("--json", help="write the collected metrics to this file")
+    args = parser.parse_args()
+
+    model = FakeGenerativeModel(
+        script=SCRIPT,
+        words_per_chunk=args.words_per_chunk,
+        first_chunk_delay=args.first_chunk_delay,
+        chunk_delay=args.chunk_delay,
+    )
+    model_future = Future()
+    model_future.set_result(model)
+
+    # Unique prompts, so every turn goes to the fake rather than the cache.
+    prompts = [f"Question {turn}: tell me something." for turn in range(args.turns)]
+    user_input = io.StringIO("\n".join(prompts + ["exit"]) + "\n")
+
+    scripted_delay = 0.0
+    for turn in range(args.turns):
+        chunks = len(split_chunks(SCRIPT[turn % len(SCRIPT)], args.words_per_chunk))
+        scripted_delay += args.first_chunk_delay + (chunks - 1) * args.chunk_delay
+
+    METRICS.reset()
+    previous_directory = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            stdin, sys.stdin = sys.stdin, user_input
+            started = time.perf_counter()
+            with open(os.devnull, "w") as devnull:
+                with contextlib.redirect_stdout(devnull):
+                    run_repl(model_future)
+            elapsed = time.perf_counter() - started
+        finally:
+            sys.stdin = stdin
+            os.chdir(previous_directory)
+
+    overhead = (elapsed - scripted_delay) / args.turns
+    print(METRICS.summary())
+    print(
+        f"{args.turns} turns in {elapsed:.2f} s, "
+        f"{scripted_delay:.2f} s of it scripted delay"
+    )
+    print(f"overhead per turn: {overhead * 1e3:.2f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            file.write(METRICS.to_json())
+    if args.budget_ms is not None and overhead * 1e3 > args.budget_ms:
+        print(f"overhead exceeds the {args.budget_ms} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
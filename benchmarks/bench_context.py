@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from context_window import ContextWindow, estimate_tokens  # noqa: E402
+from fake_gemini import FakeGenerativeModel  # noqa: E402
+
+
+def payload_tokens(chat, message):
+    texts = [part for content in chat.history for part in content["parts"]]
+    return sum(estimate_tokens(text) for text in texts) + estimate_tokens(message)
+
+
+def run(turns, context):
+    model = FakeGenerativeModel(reply=lambda message: f"A reply to '{message}'. " * 12)
+    chat = model.start_chat(history=[])
+    payloads = []
+    for turn in range(turns):
+        message = f"Synthetic question number {turn} about a long running session."
+        if context is not None:
+            context.apply(chat, message)
+        payloads.append(payload_tokens(chat, message))
+        reply = chat.send_message(message, stream=True).text
+        if context is not None:
+            context.add_exchange(message, reply)
+    return payloads
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-turn payload over a session.")
+    parser.add_argument("--turns", type=int, default=500)
+    parser.add_argument("--budget", type=int, default=4096)
+    args = parser.parse_args()
+
+    unbounded = run(args.turns, None)
+    context = ContextWindow(args.budget, system_message="You are a helpful assistant.")
+    windowed = run(args.turns, context)
+
+    print(f"{'turn':>6} {'full history':>14} {'context window':>16}")
+    step = max(args.turns // 10, 1)
+    for turn in list(range(0, args.turns, step)) + [args.turns - 1]:
+        print(f"{turn + 1:>6} {unbounded[turn]:>14} {windowed[turn]:>16}")
+    print(f"total tokens sent: {sum(unbounded)} vs {sum(windowed)}")
+    print(context.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from session_log import SessionLog  # noqa: E402
+
+# The child keeps chatting until it is killed, reporting each message once
+# add_message() has returned.
+CHILD = """
+import sys, time
+sys.path.insert(0, {root!r})
+from history import ChatHistoryManager
+
+manager = ChatHistoryManager({filename!r}, flush_interval={interval}, flush_size={size})
+manager.new_session()
+count = 0
+while True:
+    count += 1
+    manager.add_message("user", f"message {{count}}")
+    print(count, flush=True)
+    time.sleep({delay})
+"""
+
+
+def run_once(directory, args):
+    filename = os.path.join(directory, "chat_history.log")
+    for suffix in ("", ".idx"):
+        if os.path.exists(filename + suffix):
+            os.remove(filename + suffix)
+
+    child = CHILD.format(
+        root=ROOT,
+        filename=filename,
+        interval=args.flush_interval,
+        size=args.flush_size,
+        delay=1 / args.messages_per_second,
+    )
+    process = subprocess.Popen(
+        [sys.executable, "-c", child], stdout=subprocess.PIPE, text=True
+    )
+    deadline = time.monotonic() + args.run_seconds
+    added = 0
+    while time.monotonic() < deadline:
+        line = process.stdout.readline()
+        if not line:
+            break
+        added = int(line)
+    # SIGKILL on POSIX, TerminateProcess on Windows: no atexit, no final flush.
+    process.kill()
+    process.wait()
+    for line in process.stdout:
+        added = max(added, int(line))
+
+    persisted = len(SessionLog(filename)) - 1  # minus the session marker
+    return added, persisted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Messages lost to a kill -9.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--run-seconds", type=float, default=3.0)
+    parser.add_argument("--messages-per-second", type=float, default=50)
+    parser.add_argument("--flush-interval", type=float, default=0.5)
+    parser.add_argument("--flush-size", type=int, default=32)
+    args = parser.parse_args()
+
+    # At most one flush worth of messages may be lost: whichever of the time
+    # or size threshold would have triggered the next write first.
+    allowed = min(args.messages_per_second * args.flush_interval, args.flush_size) + 1
+    worst = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for run in range(args.runs):
+            added, persisted = run_once(directory, args)
+            lost = added - persisted
+            worst = max(worst, lost)
+            print(f"run {run + 1}: added {added}, persisted {persisted}, lost {lost}")
+
+    print(f"worst loss: {worst} messages (allowed: {allowed:.0f})")
+    sys.exit(0 if worst <= allowed else 1)
+
+
+if __name__ == "__main__":
+    main()
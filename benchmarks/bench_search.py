@@ -0,0 +1,92 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from history_search import HistorySearchIndex  # noqa: E402
+from session_log import SessionLog  # noqa: E402
+
+WORDS = (
+    "gemini model stream chunk history session melody story travel places "
+    "electoral bond court news weather python code error request reply token "
+    "budget cache search index query latency river mountain forest crystal "
+    "village festival recipe temple market ocean harbour library museum"
+).split()
+
+
+def generate(log, megabytes, seed):
+    rng = random.Random(seed)
+    vocabulary = WORDS + [f"term{number}" for number in range(20000)]
+    written = 0
+    timestamp = time.time() - 365 * 24 * 60 * 60
+    session = 0
+    while written < megabytes * 1024 * 1024:
+        records = []
+        for turn in range(50):
+            text = " ".join(rng.choices(vocabulary, k=rng.randint(20, 300)))
+            timestamp += 1
+            role = "user" if turn % 2 == 0 else "gemini"
+            records.append(
+                {"session": session, "timestamp": timestamp, "role": role, "text": text}
+            )
+            written += len(text)
+        log.append(records)
+        session += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="History search benchmark.")
+    parser.add_argument("--megabytes", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        log = SessionLog(os.path.join(directory, "chat_history.log"))
+        started = time.perf_counter()
+        generate(log, args.megabytes, args.seed)
+        print(
+            f"generated {args.megabytes} MB, {len(log)} messages "
+            f"in {time.perf_counter() - started:.1f} s"
+        )
+
+        index = HistorySearchIndex(os.path.join(directory, "search.sqlite3"))
+        started = time.perf_counter()
+        index.sync(log)
+        print(f"initial index build: {time.perf_counter() - started:.1f} s")
+
+        log.append(
+            [
+                {
+                    "session": log.last_session() + 1,
+                    "timestamp": time.time(),
+                    "role": "user",
+                    "text": "one more incremental message",
+                }
+            ]
+        )
+        started = time.perf_counter()
+        index.sync(log)
+        print(f"incremental update: {(time.perf_counter() - started) * 1e3:.2f} ms")
+
+        rng = random.Random(args.seed)
+        timings = []
+        for _ in range(args.queries):
+            terms = " ".join(rng.sample(WORDS, rng.randint(1, 3)))
+            started = time.perf_counter()
+            index.search(terms)
+            timings.append(time.perf_counter() - started)
+        index.close()
+
+    timings.sort()
+    p50 = timings[len(timings) // 2] * 1e3
+    p99 = timings[min(int(len(timings) * 0.99), len(timings) - 1)] * 1e3
+    print(f"query p50: {p50:.2f} ms, p99: {p99:.2f} ms (target < 50 ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_gemini import FakeGenerativeModel  # noqa: E402
+from server import ChatServer  # noqa: E402
+
+
+async def request(host, port, method, path, payload=None, on_first_chunk=None):
+    reader, writer = await asyncio.open_connection(host, port)
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: {host}\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1")
+        + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    if headers.get("transfer-encoding") == "chunked":
+        parts = []
+        while size := int(await reader.readline(), 16):
+            if not parts and on_first_chunk:
+                on_first_chunk()
+            parts.append(await reader.readexactly(size + 2))
+        data = b"".join(part[:-2] for part in parts)
+    else:
+        data = await reader.read()
+    writer.close()
+    return status, data
+
+
+async def run_session(host, port, turns, first_token_times):
+    _, data = await request(host, port, "POST", "/sessions")
+    session_id = json.loads(data)["session_id"]
+    for turn in range(turns):
+        started = time.perf_counter()
+        await request(
+            host,
+            port,
+            "POST",
+            f"/sessions/{session_id}/messages",
+            {"message": f"turn {turn} of a load test"},
+            lambda: first_token_times.append(time.perf_counter() - started),
+        )
+    await request(host, port, "DELETE", f"/sessions/{session_id}")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+async def main(args):
+    model = FakeGenerativeModel(
+        first_chunk_delay=args.first_chunk_delay, chunk_delay=args.chunk_delay
+    )
+    server = ChatServer(model, max_concurrency=args.max_concurrency)
+    host, port = await server.start(port=0)
+
+    clients = asyncio.Semaphore(args.clients)
+    first_token_times = []
+
+    async def client():
+        async with clients:
+            await run_session(host, port, args.turns, first_token_times)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(args.sessions)))
+    elapsed = time.perf_counter() - started
+    await server.close()
+
+    print(f"{args.sessions} sessions x {args.turns} turns in {elapsed:.2f} s")
+    print(f"sessions/sec: {args.sessions / elapsed:.1f}")
+    print(f"time-to-first-token p50: {percentile(first_token_times, 0.5) * 1e3:.2f} ms")
+    print(f"time-to-first-token p99: {percentile(first_token_times, 0.99) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test the --serve mode.")
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--clients", type=int, default=100)
+    parser.add_argument("--max-concurrency", type=int, default=32)
+    parser.add_argument("--first-chunk-delay", type=float, default=0.02)
+    parser.add_argument("--chunk-delay", type=float, default=0.002)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,89 @@
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PROMPT = b"User: "
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def import_profile(top):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import chat"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+    )
+    total = 0
+    imports = []
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if not match:
+            continue
+        own, cumulative, indent, module = match.groups()
+        imports.append((int(own), module))
+        if module == "chat" and len(indent) == 1:
+            total = int(cumulative)
+    imports.sort(reverse=True)
+    print(f"import chat: {total / 1e3:.1f} ms, slowest modules by own time:")
+    for own, module in imports[:top]:
+        print(f"  {own / 1e3:8.1f} ms  {module}")
+
+
+def time_to_prompt(command, repeat):
+    timings = []
+    environment = dict(os.environ)
+    environment.setdefault("GEMINI_API_KEY", "benchmark")
+    for _ in range(repeat):
+        # Run in a scratch directory so history and cache files stay out of the tree.
+        with tempfile.TemporaryDirectory() as directory:
+            started = time.perf_counter()
+            process = subprocess.Popen(
+                command,
+                cwd=directory,
+                env=environment,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            output = b""
+            while not output.endswith(PROMPT):
+                data = process.stdout.read(1)
+                if not data:
+                    raise RuntimeError(f"{command[0]} exited before prompting.")
+                output += data
+            timings.append(time.perf_counter() - started)
+            process.communicate(b"exit\n", timeout=60)
+    return statistics.median(timings)
+
+
+def main():
+    default_binary = os.path.join(
+        ROOT, "dist", "chat", "chat.exe" if os.name == "nt" else "chat"
+    )
+    parser = argparse.ArgumentParser(description="Startup time benchmark.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--binary", default=default_binary)
+    args = parser.parse_args()
+
+    import_profile(args.top)
+
+    source = time_to_prompt(
+        [sys.executable, os.path.join(ROOT, "chat.py")], args.repeat
+    )
+    print(f"time-to-prompt (source): {source * 1e3:.1f} ms")
+    if os.path.exists(args.binary):
+        frozen = time_to_prompt([args.binary], args.repeat)
+        print(f"time-to-prompt (frozen): {frozen * 1e3:.1f} ms")
+    else:
+        print(f"time-to-prompt (frozen): skipped, {args.binary} not built")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_gemini import FakeStreamingResponse  # noqa: E402
+from streaming import render_stream, finalize_text  # noqa: E402
+
+
+class TimedSink:
+    def __init__(self, out):
+        self.out = out
+        self.first_write = None
+
+    def write(self, text):
+        if self.first_write is None:
+            self.first_write = time.perf_counter()
+        self.out.write(text)
+
+    def flush(self):
+        self.out.flush()
+
+
+# The pre-pipeline renderer, kept here as the baseline being measured against.
+def legacy_render(response, out):
+    response_text = ""
+    for chunk in response:
+        if chunk.text.endswith("."):
+            response_text += chunk.text
+        else:
+            response_text += re.sub(r"\s*$", ".", chunk.text)
+        print(chunk.text, file=out)
+    return response_text
+
+
+def pipeline_render(response, out):
+    parts = list(render_stream(response, out))
+    out.write("\n")
+    out.flush()
+    return finalize_text("".join(parts))
+
+
+def measure(render, chunks, first_chunk_delay, repeat):
+    per_chunk = []
+    first_token = []
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        for _ in range(repeat):
+            sink = TimedSink(devnull)
+            response = FakeStreamingResponse(chunks, first_chunk_delay)
+            started = time.perf_counter()
+            render(response, sink)
+            finished = time.perf_counter()
+            first_token.append(sink.first_write - started)
+            per_chunk.append((finished - started - first_chunk_delay) / len(chunks))
+    return min(per_chunk), sorted(first_token)[len(first_token) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming render micro-benchmark.")
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--chunk-size", type=int, default=40)
+    parser.add_argument("--first-chunk-delay", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    chunk = ("lorem ipsum dolor sit amet " * 8)[: args.chunk_size]
+    chunks = [chunk] * args.chunks
+
+    for name, render in (("legacy", legacy_render), ("pipeline", pipeline_render)):
+        per_chunk, first_token = measure(
+            render, chunks, args.first_chunk_delay, args.repeat
+        )
+        print(
+            f"{name:>8}: {per_chunk * 1e6:8.2f} us/chunk, "
+            f"time-to-first-token {first_token * 1e3:7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,75 +1,68 @@
-import google.generativeai as genai
-from dotenv import load_dotenv
+import argparse
 import os
-from datetime import datetime
-import re
-
-
-class ChatHistoryManager:
-    def __init__(self, filename="chat_history.txt", max_file_size_mb=5):
-        self.history = []
-        self.filename = filename
-        self.max_file_size_mb = max_file_size_mb
-
-    def add_message(self, role, text):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.history.append({"role": role, "text": text, "timestamp": timestamp})
-
-    def save_to_file(self):
-        self._rotate_file_if_needed()
-        with open(self.filename, "a", encoding="utf-8") as file:
-            for message in self.history:
-                file.write(
-                    f"{message['timestamp']} {message['role']}: {message['text']}\n"
-                )
-        self.history.clear()
-
-    def display(self):
-        for message in self.history:
-            print(f"{message['timestamp']} {message['role']}: {message['text']}")
-
-    def _rotate_file_if_needed(self):
-        if not os.path.exists(self.filename):
-            with open(self.filename, "a", encoding="utf-8") as file:
-                pass
-
-        if os.path.getsize(self.filename) > self.max_file_size_mb * 1024 * 1024:
-            os.rename(self.filename, self.filename + ".backup")
-
-
-def main():
-    load_dotenv()
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError(
-            "API key not found. Please set your GEMINI_API_KEY in the environment."
-        )
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    CONTEXT_TOKEN_BUDGET,
+    GENERATION_CONFIG,
+    MODEL_NAME,
+    SAFETY_SETTINGS,
+    SYSTEM_MESSAGE,
+    get_api_key,
+)
+from context_window import ContextWindow
+from history import ChatHistoryManager
+from history_search import HistorySearchIndex
+from instrumentation import METRICS, instrument_stream
+from response_cache import CachedChat, ResponseCache
+from streaming import collect_response
+
+
+def create_model(fake=False):
+    if fake:
+        from fake_gemini import FakeGenerativeModel
+
+        return FakeGenerativeModel(MODEL_NAME)
+
+    # Importing the SDK (grpc, protobuf, ...) dominates startup, so it is
+    # deferred until a model is actually needed.
+    import google.generativeai as genai
+
+    genai.configure(api_key=get_api_key())
+    return genai.GenerativeModel(
+        MODEL_NAME,
+        generation_config=GENERATION_CONFIG,
+        safety_settings=SAFETY_SETTINGS,
+    )
+
+
+def create_model_in_background(fake=False):
+    executor = ThreadPoolExecutor(max_workers=1)
+    future = executor.submit(create_model, fake)
+    executor.shutdown(wait=False)
+    return future
 
-    genai.configure(api_key=api_key)
-
-    generation_config = {
-        "temperature": 0.7,
-        "top_p": 1,
-        "top_k": 1,
-        "max_output_tokens": 2048,
-    }
-
-    safety_settings = {
-        "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
-        "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
-        "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
-        "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
-    }
-
-    history_manager = ChatHistoryManager()
-    history_manager.add_message("system", "--- New Session ---")
-
-    model = genai.GenerativeModel(
-        "gemini-pro",
-        generation_config=generation_config,
-        safety_settings=safety_settings,
+
+def start_chat(model, cache):
+    return CachedChat(
+        model.start_chat(history=[]),
+        cache,
+        MODEL_NAME,
+        GENERATION_CONFIG,
+        SAFETY_SETTINGS,
     )
-    chat = model.start_chat(history=[])
+
+
+def run_repl(model_future):
+    history_manager = ChatHistoryManager(search_index=HistorySearchIndex())
+    history_manager.new_session()
+
+    cache = ResponseCache()
+    context = ContextWindow(CONTEXT_TOKEN_BUDGET, SYSTEM_MESSAGE)
+    # The model is still loading while the first prompt is shown; the chat is
+    # only started once there is a message to send.
+    chat = None
 
     while True:
         user_input = input("User: ").strip()
@@ -77,35 +70,153 @@ def main():
             print("Please enter some text.")
             continue
 
+        # These flush the history writer, which reports earlier failed writes.
         if user_input.lower() == "history":
-            history_manager.display()
+            try:
+                history_manager.display()
+            except Exception as e:
+                report_error(e)
+            continue
+
+        if user_input.lower().startswith("search "):
+            try:
+                results = history_manager.search(user_input[len("search ") :])
+            except Exception as e:
+                report_error(e)
+                continue
+            if not results:
+                print("No matching messages.")
+            for result in results:
+                print(f"{result['timestamp']} {result['role']}: {result['snippet']}")
             continue
 
         if user_input.lower() == "restart":
-            history_manager.save_to_file()
+            try:
+                history_manager.save_to_file()
+            except Exception as e:
+                report_error(e)
+                continue
             os.system("cls" if os.name == "nt" else "clear")
-            history_manager.add_message("system", "--- New Session ---")
-            chat = model.start_chat(history=[])
+            history_manager.new_session()
+            context.clear()
+            chat = None
+            continue
+
+        if user_input.lower() == "cache":
+            print(cache.summary())
+            continue
+
+        if user_input.lower() == "context":
+            print(context.summary())
+            continue
+
+        if user_input.lower() in ("stats", "stats json", "stats prometheus"):
+            export = user_input.lower()[len("stats ") :]
+            if export == "json":
+                print(METRICS.to_json())
+            elif export == "prometheus":
+                print(METRICS.to_prometheus(), end="")
+            else:
+                print(METRICS.summary())
             continue
 
         if user_input.lower() == "exit":
-            history_manager.save_to_file()
+            history_manager.close()
+            cache.close()
             break
 
         try:
-            response = chat.send_message(user_input, stream=True)
-            response_text = ""
-            for chunk in response:
-                if chunk.text.endswith("."):
-                    response_text += chunk.text
-                else:
-                    response_text += re.sub(r"\s*$", ".", chunk.text)
-                print(chunk.text)
+            if chat is None:
+                chat = start_chat(model_future.result(), cache)
+            context.apply(chat, user_input)
+            started = time.perf_counter()
+            with METRICS.timer("send_message_seconds"):
+                response = chat.send_message(user_input, stream=True)
+            response_text = collect_response(instrument_stream(response, started))
+            context.add_exchange(user_input, response_text)
 
             history_manager.add_message("user", user_input)
             history_manager.add_message("gemini", response_text)
         except Exception as e:
-            print(f"An error occurred: {e}")
+            report_error(e)
+
+
+def report_error(error):
+    METRICS.record_error(error)
+    print(f"An error occurred: {error}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Chat with Gemini Pro.")
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="serve concurrent chat sessions over HTTP instead of the REPL",
+    )
+    parser.add_argument(
+        "--fake",
+        action="store_true",
+        help="use a local fake Gemini model; no API key or network needed",
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=32,
+        help="maximum number of replies streamed from Gemini at once",
+    )
+
+    subparsers = parser.add_subparsers(dest="command")
+    batch_parser = subparsers.add_parser(
+        "batch", help="run every prompt in a JSONL file and write the replies"
+    )
+    batch_parser.add_argument("input", help="JSONL file of prompts or conversations")
+    batch_parser.add_argument("-o", "--output", default="responses.jsonl")
+    batch_parser.add_argument(
+        "--checkpoint", help="finished request ids (default: OUTPUT.checkpoint)"
+    )
+    batch_parser.add_argument("--workers", type=int, default=8)
+    batch_parser.add_argument(
+        "--requests-per-minute",
+        type=int,
+        default=60,
+        help="rate limit shared by all workers",
+    )
+    batch_parser.add_argument("--max-retries", type=int, default=5)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command is None and not args.serve:
+        if not args.fake:
+            # Fail before the first prompt rather than after the first message.
+            get_api_key()
+        run_repl(create_model_in_background(args.fake))
+        return
+
+    model = create_model(args.fake)
+    if args.command == "batch":
+        from batch import BatchRunner
+
+        runner = BatchRunner(
+            model,
+            workers=args.workers,
+            requests_per_minute=args.requests_per_minute,
+            max_retries=args.max_retries,
+        )
+        counts = runner.run(args.input, args.output, args.checkpoint)
+        print(
+            f"Completed {counts['completed']}, failed {counts['failed']}, "
+            f"skipped {counts['skipped']} already finished."
+        )
+        return
+
+    if args.serve:
+        from server import serve
+
+        serve(model, args.host, args.port, args.max_concurrency)
 
 
 if __name__ == "__main__":
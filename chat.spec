@@ -1,5 +1,22 @@
 # -*- mode: python ; coding: utf-8 -*-
+import sys
 
+# Modules that end up in the bundle through build tooling or optional
+# dependencies but are never imported by the app.
+# tqdm stays: google.generativeai.operations imports it at module level.
+excludes = [
+    "PyInstaller",
+    "altgraph",
+    "doctest",
+    "pefile",
+    "pydoc",
+    "setuptools",
+    "tkinter",
+    "unittest",
+]
+if sys.platform != "win32":
+    # tqdm.utils only imports colorama on Windows.
+    excludes += ["colorama", "win32ctypes"]
 
 a = Analysis(
     ['chat.py'],
@@ -10,7 +27,7 @@ a = Analysis(
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    excludes=excludes,
     noarchive=False,
 )
 pyz = PYZ(a.pure)
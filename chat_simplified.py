@@ -1,61 +1,13 @@
 import google.generativeai as genai
-from dotenv import load_dotenv
 import os
-from datetime import datetime
-import re
 
-
-class ChatHistoryManager:
-    def __init__(self, filename="chat_history.txt", max_file_size_mb=5):
-        self.history = []
-        self.filename = filename
-        self.max_file_size_mb = max_file_size_mb
-
-    def add_message(self, role, text):
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.history.append({"role": role, "text": text, "timestamp": timestamp})
-
-    def save_to_file(self):
-        self._rotate_file_if_needed()
-        with open(self.filename, "a", encoding="utf-8") as file:
-            for message in self.history:
-                file.write(
-                    f"{message['timestamp']} {message['role']}: {message['text']}\n"
-                )
-        self.history.clear()
-
-    def display(self):
-        for message in self.history:
-            print(f"{message['timestamp']} {message['role']}: {message['text']}")
-
-    def _rotate_file_if_needed(self):
-        if not os.path.exists(self.filename):
-            with open(self.filename, "a", encoding="utf-8") as file:
-                pass
-
-        if os.path.getsize(self.filename) > self.max_file_size_mb * 1024 * 1024:
-            os.rename(self.filename, self.filename + ".backup")
-
-
-def get_api_key():
-    load_dotenv()
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError(
-            "API key not found. Please set your GEMINI_API_KEY in the environment."
-        )
-    return api_key
+from config import GENERATION_CONFIG, MODEL_NAME, SAFETY_SETTINGS, get_api_key
+from history import ChatHistoryManager
+from streaming import collect_response
 
 
 def format_response(response):
-    response_text = ""
-    for chunk in response:
-        if chunk.text.endswith("."):
-            response_text += chunk.text
-        else:
-            response_text += re.sub(r"\s*$", ".", chunk.text)
-        print(chunk.text)
-    return response_text
+    return collect_response(response)
 
 
 def handle_user_command(command, history_manager, model):
@@ -65,7 +17,7 @@ def handle_user_command(command, history_manager, model):
     elif command == "restart":
         history_manager.save_to_file()
         os.system("cls" if os.name == "nt" else "clear")
-        history_manager.add_message("system", "--- New Session ---")
+        history_manager.new_session()
         model.start_chat(history=[])
         return True
     elif command == "exit":
@@ -78,27 +30,13 @@ def main():
     api_key = get_api_key()
     genai.configure(api_key=api_key)
 
-    generation_config = {
-        "temperature": 0.7,
-        "top_p": 1,
-        "top_k": 1,
-        "max_output_tokens": 2048,
-    }
-
-    safety_settings = {
-        "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
-        "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
-        "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
-        "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
-    }
-
     history_manager = ChatHistoryManager()
-    history_manager.add_message("system", "--- New Session ---")
+    history_manager.new_session()
 
     model = genai.GenerativeModel(
-        "gemini-pro",
-        generation_config=generation_config,
-        safety_settings=safety_settings,
+        MODEL_NAME,
+        generation_config=GENERATION_CONFIG,
+        safety_settings=SAFETY_SETTINGS,
     )
     chat = model.start_chat(history=[])
 
@@ -0,0 +1,34 @@
+import os
+
+MODEL_NAME = "gemini-pro"
+
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 1,
+    "top_k": 1,
+    "max_output_tokens": 2048,
+}
+
+SAFETY_SETTINGS = {
+    "HARM_CATEGORY_HARASSMENT": "BLOCK_NONE",
+    "HARM_CATEGORY_HATE_SPEECH": "BLOCK_NONE",
+    "HARM_CATEGORY_SEXUALLY_EXPLICIT": "BLOCK_NONE",
+    "HARM_CATEGORY_DANGEROUS_CONTENT": "BLOCK_NONE",
+}
+
+# Older turns are dropped once the resent conversation would exceed this many
+# tokens. SYSTEM_MESSAGE, when set, is always kept at the start of the context.
+CONTEXT_TOKEN_BUDGET = 8192
+SYSTEM_MESSAGE = None
+
+
+def get_api_key():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    api_key = os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        raise ValueError(
+            "API key not found. Please set your GEMINI_API_KEY in the environment."
+        )
+    return api_key
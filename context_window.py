@@ -0,0 +1,105 @@
+from collections import deque
+
+SYSTEM_ACKNOWLEDGEMENT = "Understood."
+
+
+def estimate_tokens(text):
+    # Roughly four characters per token for English text, which keeps the
+    # budget check local instead of a count_tokens round trip per message.
+    return len(text) // 4 + 1
+
+
+class ContextWindow:
+    def __init__(
+        self,
+        token_budget=8192,
+        system_message=None,
+        count_tokens=None,
+        summarize=None,
+    ):
+        self.token_budget = token_budget
+        self.system_message = system_message
+        self.count_tokens = count_tokens or estimate_tokens
+        self.summarize = summarize
+        self.summary_text = None
+        self.sent_tokens = []
+        self.dropped_exchanges = 0
+        self._exchanges = deque()
+        self._window_tokens = 0
+        self._pinned_tokens = 0
+        self._pin()
+
+    def add_exchange(self, user_text, model_text):
+        tokens = self.count_tokens(user_text) + self.count_tokens(model_text)
+        self._exchanges.append((user_text, model_text, tokens))
+        self._window_tokens += tokens
+
+    def apply(self, chat, message):
+        message_tokens = self.count_tokens(message)
+        self._trim(self.token_budget - message_tokens)
+        chat.history = self.contents()
+        self.sent_tokens.append(
+            self._pinned_tokens + self._window_tokens + message_tokens
+        )
+
+    def contents(self):
+        preamble = self._preamble()
+        contents = []
+        if preamble:
+            contents.append({"role": "user", "parts": [preamble]})
+            contents.append({"role": "model", "parts": [SYSTEM_ACKNOWLEDGEMENT]})
+        for user_text, model_text, _ in self._exchanges:
+            contents.append({"role": "user", "parts": [user_text]})
+            contents.append({"role": "model", "parts": [model_text]})
+        return contents
+
+    def clear(self):
+        self._exchanges.clear()
+        self._window_tokens = 0
+        self.summary_text = None
+        self._pin()
+
+    def summary(self):
+        last = self.sent_tokens[-1] if self.sent_tokens else 0
+        peak = max(self.sent_tokens, default=0)
+        return (
+            f"turns in window: {len(self._exchanges)}, "
+            f"dropped: {self.dropped_exchanges}, "
+            f"tokens in window: {self._pinned_tokens + self._window_tokens}"
+            f"/{self.token_budget}, "
+            f"sent last turn: {last}, peak sent: {peak}"
+        )
+
+    def _trim(self, budget):
+        dropped = []
+        while self._exchanges and self._pinned_tokens + self._window_tokens > budget:
+            exchange = self._exchanges.popleft()
+            self._window_tokens -= exchange[2]
+            dropped.append(exchange)
+        if not dropped:
+            return
+        self.dropped_exchanges += len(dropped)
+        if self.summarize is not None:
+            self.summary_text = self.summarize(
+                self.summary_text, [(user, model) for user, model, _ in dropped]
+            )
+            self._pin()
+            # A summary that outgrows the budget still has to make room.
+            if self._pinned_tokens + self._window_tokens > budget:
+                self._trim(budget)
+
+    def _preamble(self):
+        texts = [
+            text
+            for text in (self.system_message, self.summary_text)
+            if text is not None
+        ]
+        return "\n\n".join(texts) if texts else None
+
+    def _pin(self):
+        preamble = self._preamble()
+        self._pinned_tokens = 0
+        if preamble:
+            self._pinned_tokens = self.count_tokens(preamble) + self.count_tokens(
+                SYSTEM_ACKNOWLEDGEMENT
+            )
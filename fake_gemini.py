@@ -0,0 +1,116 @@
+import asyncio
+import itertools
+import re
+import time
+
+
+class FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeStreamingResponse:
+    def __init__(self, chunks, first_chunk_delay=0.0, chunk_delay=0.0):
+        self.chunks = list(chunks)
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_delay = chunk_delay
+
+    def __iter__(self):
+        for position, text in enumerate(self.chunks):
+            delay = self.chunk_delay if position else self.first_chunk_delay
+            if delay:
+                time.sleep(delay)
+            yield FakeChunk(text)
+
+    @property
+    def text(self):
+        return "".join(self.chunks)
+
+
+class FakeAsyncStreamingResponse:
+    def __init__(self, chunks, first_chunk_delay=0.0, chunk_delay=0.0):
+        self.chunks = list(chunks)
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_delay = chunk_delay
+
+    async def __aiter__(self):
+        for position, text in enumerate(self.chunks):
+            delay = self.chunk_delay if position else self.first_chunk_delay
+            if delay:
+                await asyncio.sleep(delay)
+            yield FakeChunk(text)
+
+
+class FakeGenerativeModel:
+    def __init__(
+        self,
+        model_name="fake-gemini",
+        reply=None,
+        words_per_chunk=4,
+        first_chunk_delay=0.0,
+        chunk_delay=0.0,
+        script=None,
+    ):
+        self.model_name = model_name
+        # A script is a fixed list of replies handed out in order, so a run is
+        # fully deterministic regardless of what was asked.
+        self.reply = reply or (scripted_reply(script) if script else echo_reply)
+        self.words_per_chunk = words_per_chunk
+        self.first_chunk_delay = first_chunk_delay
+        self.chunk_delay = chunk_delay
+
+    def start_chat(self, history=None):
+        return FakeChatSession(self, history)
+
+    async def generate_content_async(self, contents, stream=False):
+        # Stateless like the real model: the caller sends the whole history
+        # and the reply answers its last message.
+        content = contents[-1]["parts"][0]
+        return FakeAsyncStreamingResponse(
+            split_chunks(self.reply(content), self.words_per_chunk),
+            self.first_chunk_delay,
+            self.chunk_delay,
+        )
+
+
+class FakeChatSession:
+    def __init__(self, model, history=None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, content, stream=False):
+        return FakeStreamingResponse(
+            self._next_chunks(content),
+            self.model.first_chunk_delay,
+            self.model.chunk_delay,
+        )
+
+    async def send_message_async(self, content, stream=False):
+        return FakeAsyncStreamingResponse(
+            self._next_chunks(content),
+            self.model.first_chunk_delay,
+            self.model.chunk_delay,
+        )
+
+    def _next_chunks(self, content):
+        text = self.model.reply(content)
+        self.history.append({"role": "user", "parts": [content]})
+        self.history.append({"role": "model", "parts": [text]})
+        return split_chunks(text, self.model.words_per_chunk)
+
+
+def echo_reply(content):
+    return f"You said: {content}"
+
+
+def scripted_reply(script):
+    replies = itertools.cycle(script)
+    return lambda content: next(replies)
+
+
+def split_chunks(text, words_per_chunk):
+    words = re.findall(r"\s*\S+\s*", text)
+    return [
+        "".join(words[start : start + words_per_chunk])
+        for start in range(0, len(words), words_per_chunk)
+    ]
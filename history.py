@@ -0,0 +1,237 @@
+import atexit
+import os
+import threading
+import time
+from datetime import datetime
+
+from instrumentation import METRICS
+from session_log import (
+    NEW_SESSION_MARKER,
+    TIMESTAMP_FORMAT,
+    SessionLog,
+    migrate_text_history,
+)
+
+
+class HistoryWriter:
+    def __init__(self, write, flush_interval=1.0, flush_size=32, max_pending=1024):
+        self.write = write
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self.max_pending = max_pending
+        self.error = None
+        self._pending = []
+        self._oldest = None
+        self._enqueued = 0
+        self._written = 0
+        self._flush_requested = False
+        self._closed = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._run, name="history-writer", daemon=True
+        )
+        self._thread.start()
+
+    def put(self, record):
+        with self._condition:
+            # Bounded: a writer that cannot keep up slows the caller down
+            # instead of letting unsaved messages pile up in memory. Failed
+            # writes are retried and reported by flush(), never by dropping
+            # the record being added.
+            while len(self._pending) >= self.max_pending and self.error is None:
+                self._condition.wait()
+            if not self._pending:
+                self._oldest = time.monotonic()
+            self._pending.append(record)
+            self._enqueued += 1
+            if len(self._pending) >= self.flush_size:
+                self._condition.notify_all()
+
+    def flush(self):
+        with self._condition:
+            target = self._enqueued
+            self._flush_requested = True
+            self._condition.notify_all()
+            while self._written < target and self.error is None:
+                self._condition.wait()
+            self._raise_error()
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._ready():
+                    timeout = None
+                    if self._pending:
+                        timeout = self._oldest + self.flush_interval - time.monotonic()
+                    self._condition.wait(timeout)
+                if self._closed and not self._pending:
+                    return
+                batch, self._pending = self._pending, []
+                self._flush_requested = False
+                self._condition.notify_all()
+
+            try:
+                self.write(batch)
+            except Exception as e:
+                with self._condition:
+                    # Keep the batch for the next attempt and report the failure
+                    # to whoever flushes next.
+                    self._pending[:0] = batch
+                    self._oldest = time.monotonic()
+                    self.error = e
+                    self._condition.notify_all()
+                time.sleep(self.flush_interval)
+                continue
+
+            with self._condition:
+                self._written += len(batch)
+                self._condition.notify_all()
+
+    def _ready(self):
+        if self._closed or self._flush_requested:
+            return True
+        if not self._pending:
+            return False
+        return (
+            len(self._pending) >= self.flush_size
+            or time.monotonic() - self._oldest >= self.flush_interval
+        )
+
+
+class ChatHistoryManager:
+    def __init__(
+        self,
+        filename="chat_history.log",
+        max_file_size_mb=5,
+        search_index=None,
+        backup_count=5,
+        flush_interval=1.0,
+        flush_size=32,
+        max_buffered_messages=1024,
+    ):
+        self.filename = filename
+        self.max_file_size_mb = max_file_size_mb
+        self.search_index = search_index
+        self.backup_count = max(backup_count, 1)
+        text_filename = os.path.splitext(filename)[0] + ".txt"
+        if not os.path.exists(filename) and (
+            os.path.exists(text_filename) or os.path.exists(text_filename + ".backup")
+        ):
+            # History kept by the plain-text versions is carried over once,
+            # when the log is first created.
+            migrate_text_history(text_filename, filename)
+        self.log = SessionLog(filename)
+        last_session = self.log.last_session()
+        self.session = 0 if last_session is None else last_session + 1
+        self._session_started = False
+        if search_index is not None:
+            for generation in range(self.backup_count, 0, -1):
+                if os.path.exists(self._generation(generation)):
+                    search_index.sync(self._generation(generation))
+            search_index.sync(self.log)
+
+        self.writer = HistoryWriter(
+            self._write, flush_interval, flush_size, max_buffered_messages
+        )
+        atexit.register(self.close)
+
+    def new_session(self):
+        if self._session_started:
+            self.session += 1
+        self._session_started = True
+        self.add_message("system", NEW_SESSION_MARKER)
+
+    def add_message(self, role, text):
+        self._session_started = True
+        self.writer.put(
+            {
+                "session": self.session,
+                "timestamp": datetime.now().timestamp(),
+                "role": role,
+                "text": text,
+            }
+        )
+
+    def save_to_file(self):
+        with METRICS.timer("save_to_file_seconds"):
+            self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+
+    def search(self, terms, limit=10):
+        if self.search_index is None:
+            return []
+        self.save_to_file()
+        return self.search_index.search(terms, limit)
+
+    def load_session(self, session):
+        return [_as_message(record) for record in self.log.read_session(session)]
+
+    def recent(self, count):
+        return [_as_message(record) for record in self.log.tail(count)]
+
+    def display(self):
+        self.save_to_file()
+        for message in self.load_session(self.session):
+            print(f"{message['timestamp']} {message['role']}: {message['text']}")
+
+    def _write(self, records):
+        # Runs on the writer thread, which is the only one appending to the log.
+        with METRICS.timer("history_write_seconds"):
+            self._rotate_file_if_needed()
+            self.log.append(records, sync=True)
+        if self.search_index is None:
+            return
+        # The records are already in the log, so an index failure must not
+        # send them back for another append; the next sync catches up.
+        try:
+            with METRICS.timer("search_index_seconds"):
+                self.search_index.sync(self.log)
+        except Exception as e:
+            METRICS.record_error(e)
+
+    def _generation(self, generation):
+        return self.filename if generation == 0 else f"{self.filename}.{generation}"
+
+    def _rotate_file_if_needed(self):
+        if self.log.size <= self.max_file_size_mb * 1024 * 1024:
+            return
+        # chat_history.log becomes .1, .1 becomes .2, ... and the oldest
+        # generation beyond backup_count is overwritten.
+        for generation in range(self.backup_count, 0, -1):
+            source = self._generation(generation - 1)
+            target = self._generation(generation)
+            if not os.path.exists(source):
+                continue
+            os.replace(source, target)
+            os.replace(source + ".idx", target + ".idx")
+            if self.search_index is not None:
+                self.search_index.rename_source(source, target)
+        self.log = SessionLog(self.filename)
+
+
+def _as_message(record):
+    return {
+        "role": record["role"],
+        "text": record["text"],
+        "timestamp": datetime.fromtimestamp(record["timestamp"]).strftime(
+            TIMESTAMP_FORMAT
+        ),
+        "created": record["timestamp"],
+        "session": record["session"],
+    }
@@ -0,0 +1,100 @@
+import sqlite3
+import threading
+from datetime import datetime
+
+from session_log import TIMESTAMP_FORMAT, SessionLog
+
+
+class HistorySearchIndex:
+    def __init__(self, filename="chat_history.search.sqlite3"):
+        self.filename = filename
+        # Synced from the history writer thread and searched from the REPL.
+        self._db = sqlite3.connect(filename, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._db.executescript(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5("
+            "text, role UNINDEXED, timestamp UNINDEXED, session UNINDEXED, "
+            "source UNINDEXED, tokenize = 'unicode61 remove_diacritics 2');"
+            "CREATE TABLE IF NOT EXISTS sources ("
+            "filename TEXT PRIMARY KEY, indexed INTEGER NOT NULL);"
+        )
+
+    def sync(self, log):
+        # Each log is indexed up to a record count, so an append only costs
+        # the new records and a shrunken log means it was replaced.
+        if isinstance(log, str):
+            log = SessionLog(log)
+        with self._lock:
+            row = self._db.execute(
+                "SELECT indexed FROM sources WHERE filename = ?", (log.filename,)
+            ).fetchone()
+            indexed = row[0] if row else 0
+            if indexed > len(log):
+                self._db.execute(
+                    "DELETE FROM messages WHERE source = ?", (log.filename,)
+                )
+                indexed = 0
+            if indexed == len(log) and row is not None:
+                return 0
+
+            records = log.read_range(indexed)
+            with self._db:
+                self._db.executemany(
+                    "INSERT INTO messages (text, role, timestamp, session, source) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        (
+                            record["text"],
+                            record["role"],
+                            record["timestamp"],
+                            record["session"],
+                            log.filename,
+                        )
+                        for record in records
+                    ),
+                )
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sources VALUES (?, ?)",
+                    (log.filename, len(log)),
+                )
+            return len(records)
+
+    def rename_source(self, old_filename, new_filename):
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM messages WHERE source = ?", (new_filename,))
+            self._db.execute("DELETE FROM sources WHERE filename = ?", (new_filename,))
+            self._db.execute(
+                "UPDATE messages SET source = ? WHERE source = ?",
+                (new_filename, old_filename),
+            )
+            self._db.execute(
+                "UPDATE sources SET filename = ? WHERE filename = ?",
+                (new_filename, old_filename),
+            )
+
+    def search(self, terms, limit=10):
+        query = " ".join('"' + term.replace('"', '""') + '"' for term in terms.split())
+        if not query:
+            return []
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT timestamp, role, session, "
+                "snippet(messages, 0, '[', ']', '...', 12) FROM messages "
+                "WHERE messages MATCH ? ORDER BY rank LIMIT ?",
+                (query, limit),
+            ).fetchall()
+        return [
+            {
+                "timestamp": datetime.fromtimestamp(timestamp).strftime(
+                    TIMESTAMP_FORMAT
+                ),
+                "role": role,
+                "session": session,
+                "snippet": " ".join(snippet.split()),
+            }
+            for timestamp, role, session, snippet in rows
+        ]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
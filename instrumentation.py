@@ -0,0 +1,209 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from context_window import estimate_tokens
+
+SECONDS_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+RATE_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        position = 0
+        while position < len(self.buckets) and value > self.buckets[position]:
+            position += 1
+        self.counts[position] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, fraction):
+        # Upper bound of the bucket holding the requested rank, so the result
+        # is an estimate that never understates the true quantile by a bucket.
+        if not self.count:
+            return 0.0
+        rank = max(math.ceil(self.count * fraction), 1)
+        seen = 0
+        for position, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if position == len(self.buckets):
+                    return self.max
+                return min(self.buckets[position], self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+        }
+
+
+class Metrics:
+    def __init__(self, prefix="gemini_chat"):
+        self.prefix = prefix
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value):
+        buckets = SECONDS_BUCKETS if name.endswith("_seconds") else RATE_BUCKETS
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(buckets)
+            histogram.observe(value)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    @contextmanager
+    def timer(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def record_error(self, error):
+        self.increment("errors_total", type=type(error).__name__)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def to_json(self):
+        with self._lock:
+            return json.dumps(
+                {
+                    "histograms": {
+                        name: histogram.to_dict()
+                        for name, histogram in self.histograms.items()
+                    },
+                    "counters": [
+                        {"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in self.counters.items()
+                    ],
+                },
+                indent=2,
+            )
+
+    def to_prometheus(self):
+        lines = []
+        with self._lock:
+            for name, histogram in sorted(self.histograms.items()):
+                metric = f"{self.prefix}_{name}"
+                lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                bounds = [*map(str, histogram.buckets), "+Inf"]
+                for bound, count in zip(bounds, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{le="{bound}"}} {cumulative}')
+                lines.append(f"{metric}_sum {histogram.sum}")
+                lines.append(f"{metric}_count {histogram.count}")
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                metric = f"{self.prefix}_{name}"
+                if metric not in typed:
+                    lines.append(f"# TYPE {metric} counter")
+                    typed.add(metric)
+                label_text = ",".join(f'{key}="{label}"' for key, label in labels)
+                if label_text:
+                    metric = f"{metric}{{{label_text}}}"
+                lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        lines = []
+        with self._lock:
+            for name, histogram in sorted(self.histograms.items()):
+                scale, unit = (1e3, " ms") if name.endswith("_seconds") else (1, "")
+                mean = histogram.sum / histogram.count
+                lines.append(
+                    f"{name}: count {histogram.count}, "
+                    f"mean {mean * scale:.2f}{unit}, "
+                    f"p50 ~{histogram.quantile(0.5) * scale:.2f}{unit}, "
+                    f"p99 ~{histogram.quantile(0.99) * scale:.2f}{unit}, "
+                    f"max {histogram.max * scale:.2f}{unit}"
+                )
+            for (name, labels), value in sorted(self.counters.items()):
+                label_text = ", ".join(f"{key}={label}" for key, label in labels)
+                lines.append(f"{name}{f' ({label_text})' if labels else ''}: {value}")
+        return "\n".join(lines) if lines else "No measurements yet."
+
+
+METRICS = Metrics()
+
+
+def instrument_stream(response, started=None, metrics=METRICS):
+    # Time spent inside next() is waiting on the network; time between handing
+    # a chunk out and being asked for the next one is the caller rendering it.
+    source = getattr(response, "source", "model")
+    metrics.increment("responses_total", source=source)
+    if source != "model":
+        # Replays from the response cache arrive instantly; timing them would
+        # make the model look faster than it is.
+        yield from response
+        return
+
+    started = started or time.perf_counter()
+    first_chunk = None
+    tokens = 0
+    iterator = iter(response)
+    while True:
+        waiting = time.perf_counter()
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            break
+        received = time.perf_counter()
+        if first_chunk is None:
+            first_chunk = received
+            metrics.observe("time_to_first_token_seconds", received - started)
+        else:
+            metrics.observe("chunk_receipt_seconds", received - waiting)
+            # Throughput is measured after the first chunk, which only
+            # reflects time-to-first-token.
+            tokens += estimate_tokens(chunk.text)
+        metrics.increment("chunks_total")
+        yield chunk
+        metrics.observe("render_seconds", time.perf_counter() - received)
+
+    finished = time.perf_counter()
+    metrics.observe("response_seconds", finished - started)
+    if tokens:
+        metrics.observe("tokens_per_second", tokens / (finished - first_chunk))
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        filename="response_cache.sqlite3",
+        max_memory_entries=256,
+        max_disk_entries=10000,
+        ttl_seconds=7 * 24 * 60 * 60,
+    ):
+        self.filename = filename
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if filename:
+            self._db = sqlite3.connect(filename, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+            )
+            self._db.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, response = entry
+                if now - created <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return response
+                del self._memory[key]
+                self.stats["evictions"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT response, created FROM responses WHERE key = ? AND created >= ?",
+                    (key, now - self.ttl_seconds),
+                ).fetchone()
+                if row is not None:
+                    response, created = row
+                    self._db.execute(
+                        "UPDATE responses SET accessed = ? WHERE key = ?", (now, key)
+                    )
+                    self._db.commit()
+                    self._remember(key, created, response)
+                    self.stats["disk_hits"] += 1
+                    return response
+
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key, response):
+        now = time.time()
+        with self._lock:
+            self._remember(key, now, response)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                    (key, response, now, now),
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def summary(self):
+        disk_entries = 0
+        if self._db is not None:
+            with self._lock:
+                disk_entries = self._db.execute(
+                    "SELECT COUNT(*) FROM responses"
+                ).fetchone()[0]
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+        return (
+            f"hits: {hits} (memory {self.stats['memory_hits']}, "
+            f"disk {self.stats['disk_hits']}), misses: {self.stats['misses']}, "
+            f"evictions: {self.stats['evictions']}, "
+            f"entries: {len(self._memory)} in memory, {disk_entries} on disk"
+        )
+
+    def _remember(self, key, created, response):
+        self._memory[key] = (created, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def _evict_disk(self, now):
+        expired = self._db.execute(
+            "DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,)
+        ).rowcount
+        overflow = self._db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        ).rowcount
+        self.stats["evictions"] += expired + overflow
+
+
+class CachedResponse:
+    # Lets instrumentation tell replays apart from replies streamed by the model.
+    source = "cache"
+
+    def __init__(self, text, words_per_chunk=8):
+        self.text = text
+        self.words_per_chunk = words_per_chunk
+
+    def __iter__(self):
+        words = re.findall(r"\s*\S+\s*", self.text)
+        for start in range(0, len(words), self.words_per_chunk):
+            yield _Chunk("".join(words[start : start + self.words_per_chunk]))
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class CachedChat:
+    def __init__(self, chat, cache, model_name, generation_config, safety_settings):
+        self.chat = chat
+        self.cache = cache
+        self.model_name = model_name
+        self.generation_config = generation_config
+        self.safety_settings = safety_settings
+
+    @property
+    def history(self):
+        return self.chat.history
+
+    @history.setter
+    def history(self, history):
+        self.chat.history = history
+
+    def send_message(self, content, stream=False):
+        key = cache_key(
+            self.model_name,
+            self.generation_config,
+            self.safety_settings,
+            self.chat.history,
+            content,
+        )
+        cached = self.cache.get(key)
+        if cached is not None:
+            # Keep the underlying session in step, as if the model had replied.
+            self.chat.history = list(self.chat.history) + [
+                {"role": "user", "parts": [content]},
+                {"role": "model", "parts": [cached]},
+            ]
+            return CachedResponse(cached)
+
+        response = self.chat.send_message(content, stream=stream)
+        return self._record(key, response)
+
+    def _record(self, key, response):
+        parts = []
+        for chunk in response:
+            parts.append(chunk.text)
+            yield chunk
+        if parts:
+            self.cache.put(key, "".join(parts))
+
+
+def cache_key(model_name, generation_config, safety_settings, history, content):
+    prefix = hashlib.sha256()
+    for message in list(history) + [{"role": "user", "parts": [content]}]:
+        role, text = _role_and_text(message)
+        prefix.update(f"{role}\0{_normalize(text)}\0".encode("utf-8"))
+    key = {
+        "model": model_name,
+        "generation_config": generation_config,
+        "safety_settings": safety_settings,
+        "prefix": prefix.hexdigest(),
+    }
+    return hashlib.sha256(
+        json.dumps(key, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _role_and_text(message):
+    if isinstance(message, dict):
+        role, parts = message.get("role", "user"), message.get("parts", [])
+    else:
+        role, parts = message.role, message.parts
+    return role, "".join(
+        part if isinstance(part, str) else getattr(part, "text", "") for part in parts
+    )
+
+
+def _normalize(text):
+    return " ".join(text.split())
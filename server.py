@@ -0,0 +1,237 @@
+import asyncio
+import json
+import time
+import uuid
+from contextlib import suppress
+
+MAX_BODY_BYTES = 1024 * 1024
+STATUS_TEXT = {
+    200: "OK",
+    201: "Created",
+    204: "No Content",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    502: "Bad Gateway",
+    503: "Service Unavailable",
+}
+_END_OF_STREAM = object()
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class ServerSession:
+    def __init__(self):
+        # Kept here rather than in a ChatSession: the SDK's send_message_async
+        # makes a blocking call, so turns go through generate_content_async.
+        self.history = []
+        self.last_used = time.monotonic()
+        # Turns in one session are strictly sequential; concurrent messages to
+        # the same session wait here instead of interleaving their history.
+        self.lock = asyncio.Lock()
+
+
+class ChatServer:
+    def __init__(
+        self,
+        model,
+        max_concurrency=32,
+        queue_size=64,
+        max_sessions=1024,
+        session_ttl=30 * 60,
+    ):
+        self.model = model
+        self.queue_size = queue_size
+        self.max_sessions = max_sessions
+        self.session_ttl = session_ttl
+        self.sessions = {}
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._server = None
+
+    async def start(self, host="127.0.0.1", port=8000):
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            request = await _read_request(reader)
+            if request is not None:
+                await self._dispatch(*request, writer)
+        except HttpError as e:
+            await _send_json(writer, e.status, {"error": e.message})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _dispatch(self, method, path, body, writer):
+        parts = [part for part in path.split("/") if part]
+
+        if parts == ["health"] and method == "GET":
+            await _send_json(writer, 200, {"sessions": len(self.sessions)})
+        elif parts == ["sessions"] and method == "POST":
+            await _send_json(writer, 201, {"session_id": self._create_session()})
+        elif len(parts) == 2 and parts[0] == "sessions" and method == "DELETE":
+            self._get_session(parts[1])
+            del self.sessions[parts[1]]
+            await _send_json(writer, 204, None)
+        elif len(parts) == 3 and parts[::2] == ["sessions", "messages"]:
+            if method != "POST":
+                raise HttpError(405, "Use POST to send a message.")
+            session = self._get_session(parts[1])
+            await self._stream_reply(session, _parse_message(body), writer)
+        else:
+            raise HttpError(404, f"No route for {method} {path}.")
+
+    def _create_session(self):
+        self._expire_sessions()
+        if len(self.sessions) >= self.max_sessions:
+            raise HttpError(503, "Too many open sessions.")
+        session_id = uuid.uuid4().hex
+        self.sessions[session_id] = ServerSession()
+        return session_id
+
+    def _get_session(self, session_id):
+        session = self.sessions.get(session_id)
+        if session is None:
+            raise HttpError(404, f"Unknown session {session_id}.")
+        session.last_used = time.monotonic()
+        return session
+
+    def _expire_sessions(self):
+        # Clients that go away without a DELETE would otherwise hold their
+        # slot forever and eventually lock everyone out with 503s.
+        cutoff = time.monotonic() - self.session_ttl
+        for session_id, session in list(self.sessions.items()):
+            if session.last_used < cutoff and not session.lock.locked():
+                del self.sessions[session_id]
+
+    async def _stream_reply(self, session, message, writer):
+        async with session.lock:
+            # A bounded queue between the model stream and the socket: a slow
+            # client stalls its own producer rather than buffering the reply.
+            queue = asyncio.Queue(self.queue_size)
+            producer = asyncio.create_task(self._produce(session, message, queue))
+            try:
+                item = await queue.get()
+                if isinstance(item, Exception):
+                    raise HttpError(502, f"An error occurred: {item}")
+
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\n"
+                    b"Content-Type: text/plain; charset=utf-8\r\n"
+                    b"Transfer-Encoding: chunked\r\n"
+                    b"Connection: close\r\n\r\n"
+                )
+                while item is not _END_OF_STREAM:
+                    if isinstance(item, Exception):
+                        # Headers are already sent, so the status cannot change.
+                        # Drop the connection without the final chunk so the
+                        # client sees a truncated body, not a complete reply.
+                        writer.transport.abort()
+                        return
+                    data = item.encode("utf-8")
+                    if data:
+                        writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+                        await writer.drain()
+                    item = await queue.get()
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+            finally:
+                session.last_used = time.monotonic()
+                producer.cancel()
+                with suppress(asyncio.CancelledError):
+                    await producer
+
+    async def _produce(self, session, message, queue):
+        content = {"role": "user", "parts": [message]}
+        try:
+            async with self._semaphore:
+                response = await self.model.generate_content_async(
+                    session.history + [content], stream=True
+                )
+                parts = []
+                async for chunk in response:
+                    parts.append(chunk.text)
+                    await queue.put(chunk.text)
+            # Only a complete reply becomes part of the conversation.
+            session.history += [content, {"role": "model", "parts": ["".join(parts)]}]
+            await queue.put(_END_OF_STREAM)
+        except Exception as e:
+            await queue.put(e)
+
+
+async def _read_request(reader):
+    request_line = await reader.readline()
+    if not request_line:
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise HttpError(400, "Malformed request line.")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length.")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "Request body is too large.")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target.split("?", 1)[0], body
+
+
+def _parse_message(body):
+    try:
+        message = json.loads(body)["message"].strip()
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise HttpError(400, 'Expected a JSON body like {"message": "..."}.')
+    if not message:
+        raise HttpError(400, "Please enter some text.")
+    return message
+
+
+async def _send_json(writer, status, payload):
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n".encode("latin-1")
+        + body
+    )
+    await writer.drain()
+
+
+def serve(model, host="127.0.0.1", port=8000, max_concurrency=32):
+    async def run():
+        server = ChatServer(model, max_concurrency=max_concurrency)
+        host_name, port_number = await server.start(host, port)
+        print(f"Serving chat sessions on http://{host_name}:{port_number}")
+        await server.serve_forever()
+
+    with suppress(KeyboardInterrupt):
+        asyncio.run(run())
@@ -0,0 +1,255 @@
+import argparse
+import json
+import mmap
+import os
+import re
+import struct
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+
+# Log record:   <payload length:u32><crc32:u32><payload: UTF-8 JSON>
+# Index entry:  <session:u32><timestamp:f64><offset:u64><payload length:u32>
+#
+# Records are only ever appended. Sessions are numbered in increasing order and
+# index timestamps never go backwards, so both keys can be binary searched.
+RECORD_HEADER = struct.Struct("<II")
+INDEX_ENTRY = struct.Struct("<IdQI")
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+NEW_SESSION_MARKER = "--- New Session ---"
+TEXT_LINE = re.compile(
+    r"^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) (system|user|gemini): ?(.*)$"
+)
+
+
+@contextmanager
+def _mapped(filename):
+    with open(filename, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+            yield view
+
+
+class SessionLog:
+    def __init__(self, filename="chat_history.log"):
+        self.filename = filename
+        self.index_filename = filename + ".idx"
+        self._last_session = None
+        self._last_timestamp = 0.0
+        self._count = 0
+        self._end = 0
+        self._recover()
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def size(self):
+        return self._end
+
+    def last_session(self):
+        return self._last_session
+
+    def append(self, records, sync=False):
+        log_chunks = []
+        index_chunks = []
+        offset = self._end
+        last_session = self._last_session
+        last_timestamp = self._last_timestamp
+        for record in records:
+            session = record["session"]
+            if last_session is not None and session < last_session:
+                raise ValueError(
+                    f"Session {session} is older than the last logged session {last_session}."
+                )
+            payload = json.dumps(record, ensure_ascii=False).encode("utf-8")
+            log_chunks.append(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)))
+            log_chunks.append(payload)
+            last_timestamp = max(last_timestamp, record["timestamp"])
+            index_chunks.append(
+                INDEX_ENTRY.pack(session, last_timestamp, offset, len(payload))
+            )
+            offset += RECORD_HEADER.size + len(payload)
+            last_session = session
+
+        if not index_chunks:
+            return
+
+        # The log is written (and optionally synced) before the index, so a
+        # crash in between only leaves unindexed records that _recover() picks
+        # up on the next open.
+        with open(self.filename, "ab") as file:
+            file.write(b"".join(log_chunks))
+            if sync:
+                file.flush()
+                os.fsync(file.fileno())
+        with open(self.index_filename, "ab") as file:
+            file.write(b"".join(index_chunks))
+
+        self._end = offset
+        self._count += len(index_chunks)
+        self._last_session = last_session
+        self._last_timestamp = last_timestamp
+
+    def read_session(self, session):
+        with _mapped(self.index_filename) as index:
+            start = self._bisect(index, lambda entry: entry[0] < session)
+            stop = self._bisect(index, lambda entry: entry[0] <= session, lo=start)
+            return self._read_entries(index, start, stop)
+
+    def read_since(self, timestamp):
+        with _mapped(self.index_filename) as index:
+            start = self._bisect(index, lambda entry: entry[1] < timestamp)
+            return self._read_entries(index, start, self._count)
+
+    def read_range(self, start, stop=None):
+        stop = self._count if stop is None else min(stop, self._count)
+        with _mapped(self.index_filename) as index:
+            return self._read_entries(index, start, stop)
+
+    def tail(self, count):
+        with _mapped(self.index_filename) as index:
+            return self._read_entries(index, max(self._count - count, 0), self._count)
+
+    def __iter__(self):
+        with _mapped(self.index_filename) as index:
+            yield from self._read_entries(index, 0, self._count)
+
+    def _entry(self, index, position):
+        return INDEX_ENTRY.unpack_from(index, position * INDEX_ENTRY.size)
+
+    def _bisect(self, index, before, lo=0):
+        hi = self._count
+        while lo < hi:
+            middle = (lo + hi) // 2
+            if before(self._entry(index, middle)):
+                lo = middle + 1
+            else:
+                hi = middle
+        return lo
+
+    def _read_entries(self, index, start, stop):
+        if start >= stop:
+            return []
+        records = []
+        with _mapped(self.filename) as log:
+            for position in range(start, stop):
+                _, _, offset, length = self._entry(index, position)
+                payload_start = offset + RECORD_HEADER.size
+                records.append(json.loads(log[payload_start : payload_start + length]))
+        return records
+
+    def _recover(self):
+        for filename in (self.filename, self.index_filename):
+            if not os.path.exists(filename):
+                open(filename, "ab").close()
+
+        log_size = os.path.getsize(self.filename)
+        index_size = os.path.getsize(self.index_filename)
+        self._count = index_size // INDEX_ENTRY.size
+
+        with _mapped(self.index_filename) as index:
+            if self._count:
+                session, timestamp, offset, length = self._entry(index, self._count - 1)
+                self._end = offset + RECORD_HEADER.size + length
+                self._last_session = session
+                self._last_timestamp = timestamp
+
+        if self._end > log_size:
+            # The index points past the end of the log; it cannot be trusted.
+            self._count = 0
+            self._end = 0
+            self._last_session = None
+            self._last_timestamp = 0.0
+        if index_size != self._count * INDEX_ENTRY.size:
+            with open(self.index_filename, "r+b") as file:
+                file.truncate(self._count * INDEX_ENTRY.size)
+
+        if self._end < log_size:
+            self._reindex_tail(log_size)
+
+    def _reindex_tail(self, log_size):
+        records = []
+        with _mapped(self.filename) as log:
+            position = self._end
+            while position + RECORD_HEADER.size <= log_size:
+                length, checksum = RECORD_HEADER.unpack_from(log, position)
+                payload = log[
+                    position + RECORD_HEADER.size : position + RECORD_HEADER.size + length
+                ]
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    break
+                records.append(json.loads(payload))
+                position += RECORD_HEADER.size + length
+
+        # Drop a torn trailing record and re-append whatever was complete.
+        with open(self.filename, "r+b") as file:
+            file.truncate(self._end)
+        self.append(records)
+
+
+def parse_text_history(filename):
+    message = None
+    with open(filename, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.rstrip("\n")
+            match = TEXT_LINE.match(line)
+            if match:
+                if message is not None:
+                    yield message
+                timestamp, role, text = match.groups()
+                message = {"timestamp": timestamp, "role": role, "text": text}
+            elif message is not None:
+                message["text"] += "\n" + line
+    if message is not None:
+        yield message
+
+
+def migrate_text_history(text_filename="chat_history.txt", log_filename=None):
+    log = SessionLog(log_filename or os.path.splitext(text_filename)[0] + ".log")
+    if len(log):
+        raise ValueError(f"{log.filename} already contains history; not migrating.")
+
+    session = -1
+    migrated = 0
+    for filename in (text_filename + ".backup", text_filename):
+        if not os.path.exists(filename):
+            continue
+        records = []
+        for message in parse_text_history(filename):
+            if message["role"] == "system" and message["text"] == NEW_SESSION_MARKER:
+                session += 1
+            session = max(session, 0)
+            created = datetime.strptime(message["timestamp"], TIMESTAMP_FORMAT)
+            records.append(
+                {
+                    "session": session,
+                    "timestamp": created.timestamp(),
+                    "role": message["role"],
+                    "text": message["text"],
+                }
+            )
+        log.append(records)
+        migrated += len(records)
+    return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Convert a plain-text chat history into a session log."
+    )
+    parser.add_argument("source", nargs="?", default="chat_history.txt")
+    parser.add_argument("destination", nargs="?")
+    args = parser.parse_args()
+
+    try:
+        migrated = migrate_text_history(args.source, args.destination)
+    except ValueError as e:
+        parser.error(str(e))
+    print(f"Migrated {migrated} messages from {args.source}.")
+
+
+if __name__ == "__main__":
+    main()
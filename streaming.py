@@ -0,0 +1,27 @@
+import sys
+
+SENTENCE_ENDINGS = ".!?:;)]}\"'`*_"
+
+
+def render_stream(response, out=None):
+    out = out or sys.stdout
+    for chunk in response:
+        text = chunk.text
+        out.write(text)
+        out.flush()
+        yield text
+
+
+def collect_response(response, out=None):
+    out = out or sys.stdout
+    parts = list(render_stream(response, out))
+    out.write("\n")
+    out.flush()
+    return finalize_text("".join(parts))
+
+
+def finalize_text(text):
+    text = text.rstrip()
+    if text and text[-1] not in SENTENCE_ENDINGS:
+        text += "."
+    return text